@@ -1,20 +1,77 @@
 import os
-import traceback
+import json
+import logging
+import pickle
+import queue
+import re
+import shutil
 import asyncio
-from datetime import datetime, timedelta
-from collections import defaultdict
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Annotated, Literal
 
-from fastapi import FastAPI, HTTPException, Request
+import aiofiles
+import httpx
+import numpy as np
+import orjson
+
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from anthropic import Client
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, StringConstraints
+from anthropic import AsyncAnthropic
+from cachetools import LRUCache
 from dotenv import load_dotenv
+from slowapi import Limiter
+from slowapi.errors import RateLimitExceeded
 
 # Load environment variables
 load_dotenv()
 
-# Initialize FastAPI app
-app = FastAPI()
+# Application logging goes through a queue drained by a background thread,
+# so stderr writes never block the event loop - even during error storms
+_log_queue = queue.Queue(-1)
+_queue_listener = QueueListener(_log_queue, logging.StreamHandler())
+
+logger = logging.getLogger("village_shop")
+logger.setLevel(logging.INFO)
+logger.addHandler(QueueHandler(_log_queue))
+logger.propagate = False
+
+def get_client_ip(request: Request) -> str:
+    """Extracts client IP address from request headers."""
+    forwarded = request.headers.get("X-Forwarded-For")
+    if forwarded:
+        # partition scans once and allocates no list, unlike split
+        return forwarded.partition(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+# Initialize FastAPI app (orjson is ~2-5x faster than stdlib json on the
+# small dicts our endpoints return)
+app = FastAPI(default_response_class=ORJSONResponse)
+
+# Rate limiting (replaces the old in-process "Dave gets busier" delay dict,
+# which broke under multiple uvicorn workers). Defaults to in-memory storage;
+# point RATE_LIMIT_STORAGE_URI at Redis for shared counters across workers.
+CHAT_RATE_LIMIT = os.getenv("CHAT_RATE_LIMIT", "3/10minutes")
+limiter = Limiter(
+    key_func=get_client_ip,
+    storage_uri=os.getenv("RATE_LIMIT_STORAGE_URI", "memory://"),
+)
+app.state.limiter = limiter
+
+@app.exception_handler(RateLimitExceeded)
+async def rate_limit_handler(request: Request, exc: RateLimitExceeded):
+    """Dave-flavoured response for customers asking too quickly."""
+    return JSONResponse(
+        status_code=429,
+        content={"detail": "Dave's a bit swamped right now - give it a few minutes and try again!"},
+    )
+
+@app.on_event("startup")
+async def start_log_listener():
+    """Start the background thread that drains the log queue."""
+    _queue_listener.start()
 
 # Configure CORS
 app.add_middleware(
@@ -32,20 +89,88 @@ if not api_key:
     print("Available env vars:", list(os.environ.keys()))
     raise ValueError("ANTHROPIC_API_KEY is required")
 
-anthropic_client = Client(api_key=api_key)
+# One shared HTTP/2 client so concurrent Anthropic calls multiplex over a
+# single warm TLS session instead of queueing on per-request connections
+http_client = httpx.AsyncClient(
+    http2=True,
+    timeout=httpx.Timeout(30.0, connect=5.0),
+    limits=httpx.Limits(max_connections=200, max_keepalive_connections=100),
+)
+anthropic_client = AsyncAnthropic(
+    api_key=api_key,
+    max_retries=2,
+    http_client=http_client,
+)
 
-# Conversation logging
-CONVERSATIONS_FILE = "daily_conversations.txt"
+@app.on_event("shutdown")
+async def close_http_client():
+    """Close the shared HTTP client cleanly."""
+    await http_client.aclose()
 
-# Rate limiting for response delays (simulates Dave getting busier)
-user_request_counts = defaultdict(list)
-MAX_REQUESTS_BEFORE_DELAY = 3
-DELAY_INCREMENT_SECONDS = 5
+@app.on_event("startup")
+async def warm_anthropic_connection():
+    """Prime the HTTP connection pool so the first real chat request
+    doesn't pay the TLS handshake cost."""
+    try:
+        await anthropic_client.messages.create(
+            model="claude-3-5-haiku-latest",
+            max_tokens=1,
+            messages=[{"role": "user", "content": "ping"}],
+        )
+    except Exception as e:
+        logger.warning("Anthropic warmup request failed (%s)", e)
 
-# Pydantic models
+# Conversation logging - entries are buffered in memory and flushed in
+# batches so disk I/O stays off the request critical path. The file
+# rotates at 10 MB so neither the log nor its download grows unbounded.
+CONVERSATIONS_FILE = "daily_conversations.txt"
+CONVERSATIONS_MAX_BYTES = 10_000_000
+CONVERSATIONS_BACKUP_COUNT = 30
+LOG_BUFFER_FLUSH_AT = 64  # flush once this many entries accumulate
+LOG_FLUSH_INTERVAL_SECONDS = 5  # background flush cadence
+DOWNLOAD_CHUNK_BYTES = 65536  # stream the download instead of reading it whole
+
+_log_buffer = []
+_log_flush_lock = asyncio.Lock()
+_log_flush_task = None
+_pending_flushes = set()  # strong refs: the loop only holds tasks weakly
+_log_handler = RotatingFileHandler(
+    CONVERSATIONS_FILE,
+    maxBytes=CONVERSATIONS_MAX_BYTES,
+    backupCount=CONVERSATIONS_BACKUP_COUNT,
+    encoding="utf-8",
+    delay=True,  # don't open the file until the first flush
+)
+_log_handler.terminator = ""  # entries carry their own trailing newlines
+_log_handler.setFormatter(logging.Formatter("%(message)s"))
+
+_conversations_logger = logging.getLogger("village_shop.conversations")
+_conversations_logger.setLevel(logging.INFO)
+_conversations_logger.propagate = False
+_conversations_logger.addHandler(_log_handler)
+
+# Exact-match response cache: O(1) hashmap hit on verbatim repeat questions,
+# checked before the semantic cache. Single-process, so no lock needed.
+_RESP_CACHE = LRUCache(maxsize=2048)
+
+# Semantic response cache (embedding similarity over previously answered questions)
+SEMANTIC_CACHE_FILE = "semantic_cache.pkl"
+SEMANTIC_CACHE_THRESHOLD = 0.9  # cosine similarity needed to reuse an answer
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+_embedder = None  # loaded on startup; cache stays disabled if loading fails
+_semantic_questions = []  # cache key per row of _semantic_matrix
+_semantic_answers = []
+_semantic_matrix = None  # numpy (N, d) matrix of L2-normalised question embeddings
+_semantic_exact = {}  # cache key -> row index, short-circuits identical questions
+_semantic_store_lock = asyncio.Lock()  # serializes stores and pickle saves
+
+# Pydantic models. The length cap rejects pathological inputs with a 422
+# before they balloon into Anthropic token cost; the Literal keeps
+# customer_type on Pydantic's fast enum validation path.
 class Query(BaseModel):
-    question: str
-    customer_type: str = "general"  # general, returning, first_time
+    question: Annotated[str, StringConstraints(strip_whitespace=True, min_length=1, max_length=1000)]
+    customer_type: Literal["general", "returning", "first_time"] = "general"
 
 class ResponseModel(BaseModel):
     answer: str
@@ -83,28 +208,61 @@ Q: Tell me about politics.
 A: Too busy to chat about that! Anything shop-related I can help with?
 """
 
-def get_response_delay(client_ip: str) -> int:
-    """Calculate response delay based on request frequency."""
-    now = datetime.now()
-    # Clean old requests (older than 10 minutes)
-    cutoff = now - timedelta(minutes=10)
-    user_request_counts[client_ip] = [req for req in user_request_counts[client_ip] if req > cutoff]
-    
-    # Add current request
-    user_request_counts[client_ip].append(now)
-    
-    # Calculate delay based on request count
-    request_count = len(user_request_counts[client_ip])
-    if request_count <= MAX_REQUESTS_BEFORE_DELAY:
-        return 0
-    
-    # Increasing delay for frequent requests
-    excess_requests = request_count - MAX_REQUESTS_BEFORE_DELAY
-    delay_seconds = excess_requests * DELAY_INCREMENT_SECONDS
-    return min(delay_seconds, 20)  # Cap at 20 seconds
+def _write_log_entries(entries):
+    """Append a batch of buffered entries via the rotating handler (blocking)."""
+    try:
+        _conversations_logger.info("".join(entries))
+    except Exception:
+        logger.exception("Failed to write conversation log")
+
+async def _flush_log_buffer_locked():
+    """Write out the buffer; the caller must hold _log_flush_lock."""
+    global _log_buffer
+    if not _log_buffer:
+        return
+    entries, _log_buffer = _log_buffer, []
+    await asyncio.to_thread(_write_log_entries, entries)
+
+async def flush_conversation_log():
+    """Swap out the buffer and write it to disk off the event loop."""
+    async with _log_flush_lock:
+        await _flush_log_buffer_locked()
+
+def _conversation_log_files():
+    """Existing log files, oldest rotated backup first, live file last."""
+    names = [f"{CONVERSATIONS_FILE}.{idx}" for idx in range(CONVERSATIONS_BACKUP_COUNT, 0, -1)]
+    names.append(CONVERSATIONS_FILE)
+    return [name for name in names if os.path.exists(name)]
+
+async def _log_flusher():
+    """Background task that flushes the log buffer every few seconds."""
+    while True:
+        await asyncio.sleep(LOG_FLUSH_INTERVAL_SECONDS)
+        await flush_conversation_log()
+
+@app.on_event("startup")
+async def start_log_flusher():
+    """Start the periodic log flusher."""
+    global _log_flush_task
+    _log_flush_task = asyncio.create_task(_log_flusher())
+
+@app.on_event("shutdown")
+async def stop_log_flusher():
+    """Stop the flusher and write out anything still buffered."""
+    if _log_flush_task is not None:
+        _log_flush_task.cancel()
+    await flush_conversation_log()
+
+# Registered after every other shutdown hook that might log - shutdown
+# handlers run in registration order, so the listener must stop last or
+# errors raised during the final flush would be queued and never drained
+@app.on_event("shutdown")
+async def stop_log_listener():
+    """Flush and stop the log listener thread."""
+    _queue_listener.stop()
 
 def log_conversation(customer_type: str, question: str, answer: str, client_ip: str):
-    """Log conversation to daily text file for owner review."""
+    """Buffer a conversation entry for the owner's daily log."""
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     log_entry = f"""
 === {timestamp} ===
@@ -115,103 +273,313 @@ Dave's Response: {answer}
 ---
 
 """
-    
+
+    _log_buffer.append(log_entry)
+    if len(_log_buffer) >= LOG_BUFFER_FLUSH_AT:
+        # Hold a strong reference until done, or the task can be
+        # garbage-collected mid-flush and its exceptions lost
+        task = asyncio.create_task(flush_conversation_log())
+        _pending_flushes.add(task)
+        task.add_done_callback(_pending_flushes.discard)
+
+def _semantic_cache_key(customer_type: str, question: str) -> str:
+    """Normalized cache key combining customer type and question."""
+    return f"{customer_type}||{question.strip().lower()}"
+
+def _load_embedder():
+    """Load the embedding model (blocking)."""
+    global _embedder
+    from sentence_transformers import SentenceTransformer
+    _embedder = SentenceTransformer(EMBEDDING_MODEL_NAME)
+
+def _load_persisted_cache():
+    """Load previously persisted cache entries, if any (blocking)."""
+    global _semantic_questions, _semantic_answers, _semantic_matrix, _semantic_exact
+    if not os.path.exists(SEMANTIC_CACHE_FILE):
+        return
+    with open(SEMANTIC_CACHE_FILE, "rb") as f:
+        saved = pickle.load(f)
+    _semantic_questions = saved["questions"]
+    _semantic_answers = saved["answers"]
+    _semantic_matrix = saved["matrix"]
+    _semantic_exact = {key: idx for idx, key in enumerate(_semantic_questions)}
+
+def _save_semantic_cache():
+    """Persist the cache beside the conversations log (blocking).
+
+    Writes to a temp file and renames it into place so a crash mid-write
+    can't leave a truncated pickle behind.
+    """
+    tmp_file = SEMANTIC_CACHE_FILE + ".tmp"
+    try:
+        with open(tmp_file, "wb") as f:
+            pickle.dump({
+                "questions": _semantic_questions,
+                "answers": _semantic_answers,
+                "matrix": _semantic_matrix,
+            }, f)
+        os.replace(tmp_file, SEMANTIC_CACHE_FILE)
+    except Exception:
+        logger.exception("Failed to persist semantic cache")
+
+def _embed(text: str):
+    """Embed text as a unit vector (blocking - run off the event loop)."""
+    return _embedder.encode(text, normalize_embeddings=True)
+
+async def semantic_cache_lookup(customer_type: str, question: str):
+    """Returns a cached answer for a semantically similar question, or None."""
+    if _embedder is None:
+        return None
+
+    key = _semantic_cache_key(customer_type, question)
+
+    # Exact-match tier: identical questions skip the vector search entirely
+    idx = _semantic_exact.get(key)
+    if idx is not None:
+        return _semantic_answers[idx]
+
+    if _semantic_matrix is None:
+        return None
+
+    query_vec = await asyncio.to_thread(_embed, key)
+    scores = _semantic_matrix @ query_vec
+    best = int(np.argmax(scores))
+    if scores[best] >= SEMANTIC_CACHE_THRESHOLD:
+        return _semantic_answers[best]
+    return None
+
+async def semantic_cache_store(customer_type: str, question: str, answer: str):
+    """Store a fresh answer so similar future questions can reuse it."""
+    global _semantic_matrix
+    if _embedder is None:
+        return
+
+    key = _semantic_cache_key(customer_type, question)
+
+    # Serialize stores: two concurrent misses on the same question would
+    # otherwise both pass the duplicate check and then race their pickle
+    # saves against each other
+    async with _semantic_store_lock:
+        if key in _semantic_exact:
+            return
+
+        vec = await asyncio.to_thread(_embed, key)
+        _semantic_exact[key] = len(_semantic_questions)
+        _semantic_questions.append(key)
+        _semantic_answers.append(answer)
+        if _semantic_matrix is None:
+            _semantic_matrix = vec[np.newaxis, :]
+        else:
+            _semantic_matrix = np.vstack([_semantic_matrix, vec])
+
+        await asyncio.to_thread(_save_semantic_cache)
+
+@app.on_event("startup")
+async def load_semantic_cache():
+    """Warm the embedding model so cache lookups are ready before traffic."""
     try:
-        with open(CONVERSATIONS_FILE, "a", encoding="utf-8") as f:
-            f.write(log_entry)
+        await asyncio.to_thread(_load_embedder)
     except Exception as e:
-        print(f"Failed to log conversation: {e}")
-
-def get_dave_prompt(question: str, customer_type: str) -> str:
-    """Builds Dave's response prompt."""
-    
-    customer_context = ""
-    if customer_type == "first_time":
-        customer_context = "This seems to be someone's first time using the honesty box. Be extra welcoming and explain how things work."
-    elif customer_type == "returning":
-        customer_context = "This is likely a regular customer. Be friendly and familiar."
-    
-    return (
-        f"You are Dave, the friendly assistant at a village shop with a modern QR code payment system. "
-        f"You're warm, helpful, and have that genuine village shopkeeper personality. You trust your "
-        f"customers and believe in community spirit.\n\n"
-        f"CURRENT STOCK: You only have two products - Huel Black Chocolate and Huel Black Vanilla. "
-        f"Both are £4.30 each. This is a not-for-profit shop just getting started. When customers ask "
-        f"for other products, acknowledge you don't have them and offer to pass requests to the owner.\n\n"
-        f"PAYMENT SYSTEM: Each product has a QR code that customers scan with their phone camera. "
-        f"This takes them to a secure Square payment page where they can pay with Apple Pay, Google Pay, "
-        f"or debit/credit cards. No cash needed, no exact change required. The system is completely secure "
-        f"and handles everything digitally. This has replaced the old honesty box system.\n\n"
-        f"CRITICAL CHARACTER RULES:\n"
-        f"1. ONLY answer questions about the shop, products, prices, payment, or shop-related matters\n"
-        f"2. For ANY non-shop questions (weather, politics, personal life, general knowledge), politely "
-        f"say you're busy and redirect to shop matters\n"
-        f"3. NEVER break character - you are always Dave the shop assistant, nothing else\n"
-        f"4. The shop has VERY LIMITED STOCK as it's just getting started - apologize for limited "
-        f"selection and always ask for suggestions to pass to the owner\n\n"
-        f"IMPORTANT: You actively collect customer feedback and pass it to the shop owner who makes "
-        f"all decisions about products, prices, and stocking. When customers mention suggestions, "
-        f"complaints, requests, or opinions about products/prices/service, ALWAYS acknowledge their "
-        f"feedback and specifically tell them you'll pass it along to the owner.\n\n"
-        f"Examples of how you respond:\n{DAVE_EXAMPLES}\n\n"
-        f"{customer_context}\n\n"
-        f"Customer asks: {question}\n\n"
-        f"Respond as Dave in a helpful, friendly way. Keep it conversational, but brief and practical. "
-        f"If it's about products, acknowledge limited stock and ask for suggestions. If it's about payment, "
-        f"explain the QR code system and reassure them it's secure and easy. If they ask non-shop questions, "
-        f"politely say you're busy and redirect. NEVER break character as Dave the shop assistant.\n\n"
-        f"Dave:"
-    )
+        # Without the model the cache really is off for this run
+        logger.warning("Semantic cache disabled (%s)", e)
+        return
 
-def get_client_ip(request: Request) -> str:
-    """Extracts client IP address from request headers."""
-    forwarded = request.headers.get("X-Forwarded-For")
-    if forwarded:
-        return forwarded.split(",")[0]
-    return request.client.host if request.client else "unknown"
+    try:
+        await asyncio.to_thread(_load_persisted_cache)
+        logger.info("Semantic cache ready (%d entries)", len(_semantic_answers))
+    except Exception:
+        # The model loaded, so the cache is enabled but starts empty and
+        # will repopulate - don't claim it's disabled. A corrupt pickle
+        # lands here, and this log line is the operator's only signal.
+        logger.exception("Semantic cache starting empty: failed to load %s", SEMANTIC_CACHE_FILE)
+
+# Dave's full system prompt - static, so Anthropic can cache the prefill.
+# Built once at import; per-customer context and the question go in the
+# (tiny) user message instead, never in here.
+DAVE_SYSTEM_PROMPT = (
+    f"You are Dave, the friendly assistant at a village shop with a modern QR code payment system. "
+    f"You're warm, helpful, and have that genuine village shopkeeper personality. You trust your "
+    f"customers and believe in community spirit.\n\n"
+    f"CURRENT STOCK: You only have two products - Huel Black Chocolate and Huel Black Vanilla. "
+    f"Both are £4.30 each. This is a not-for-profit shop just getting started. When customers ask "
+    f"for other products, acknowledge you don't have them and offer to pass requests to the owner.\n\n"
+    f"PAYMENT SYSTEM: Each product has a QR code that customers scan with their phone camera. "
+    f"This takes them to a secure Square payment page where they can pay with Apple Pay, Google Pay, "
+    f"or debit/credit cards. No cash needed, no exact change required. The system is completely secure "
+    f"and handles everything digitally. This has replaced the old honesty box system.\n\n"
+    f"CRITICAL CHARACTER RULES:\n"
+    f"1. ONLY answer questions about the shop, products, prices, payment, or shop-related matters\n"
+    f"2. For ANY non-shop questions (weather, politics, personal life, general knowledge), politely "
+    f"say you're busy and redirect to shop matters\n"
+    f"3. NEVER break character - you are always Dave the shop assistant, nothing else\n"
+    f"4. The shop has VERY LIMITED STOCK as it's just getting started - apologize for limited "
+    f"selection and always ask for suggestions to pass to the owner\n\n"
+    f"IMPORTANT: You actively collect customer feedback and pass it to the shop owner who makes "
+    f"all decisions about products, prices, and stocking. When customers mention suggestions, "
+    f"complaints, requests, or opinions about products/prices/service, ALWAYS acknowledge their "
+    f"feedback and specifically tell them you'll pass it along to the owner.\n\n"
+    f"Examples of how you respond:\n{DAVE_EXAMPLES}\n\n"
+    f"Respond as Dave in a helpful, friendly way. Keep it conversational, but brief and practical. "
+    f"If it's about products, acknowledge limited stock and ask for suggestions. If it's about payment, "
+    f"explain the QR code system and reassure them it's secure and easy. If they ask non-shop questions, "
+    f"politely say you're busy and redirect. NEVER break character as Dave the shop assistant."
+)
 
-# Chat endpoint
-@app.post("/api/chat", response_model=ResponseModel)
+# Marked ephemeral so Anthropic skips re-prefilling the ~800 static tokens
+# on cache hits - only the short user message below gets prefilled.
+DAVE_SYSTEM_BLOCKS = [
+    {
+        "type": "text",
+        "text": DAVE_SYSTEM_PROMPT,
+        "cache_control": {"type": "ephemeral"},
+    }
+]
+
+# Per-customer-type context, precomputed so the hot path is a dict lookup
+# plus string concatenation - no per-request formatting work.
+_CUSTOMER_CONTEXT = {
+    "first_time": "This seems to be someone's first time using the honesty box. Be extra welcoming and explain how things work.",
+    "returning": "This is likely a regular customer. Be friendly and familiar.",
+}
+
+def get_dave_prompt(question: str, customer_type: str) -> tuple:
+    """Builds Dave's prompt as (system_blocks, user_text).
+
+    The system blocks are static and cacheable; only the customer context
+    and question vary per request.
+    """
+    context = _CUSTOMER_CONTEXT.get(customer_type, "")
+    user_text = context + "\n\nCustomer asks: " + question + "\n\nDave:"
+    return DAVE_SYSTEM_BLOCKS, user_text
+
+# Off-topic deflection: the character rules already make the model refuse
+# non-shop questions, but each refusal costs a full Anthropic call. Obvious
+# cases get Dave's canned redirect locally instead. A shop keyword anywhere
+# in the question overrides, so "could you stock football magazines" still
+# reaches the model. Tune both patterns from the [OFF-TOPIC] log entries.
+_OFFTOPIC_PATTERN = re.compile(
+    r"\b(weather|politics|president|election|prime minister|joke|poem|recipe|bitcoin|football|news)\b",
+    re.IGNORECASE,
+)
+_SHOP_PATTERN = re.compile(
+    r"\b(shop|stock|huel|pay|payment|price|prices|qr|owner|buy|sell|flavou?rs?|products?|chocolate|vanilla|square)\b",
+    re.IGNORECASE,
+)
+OFFTOPIC_RESPONSE = "Bit busy with the shop today! Anything I can help with regarding our stock or payments?"
+
+def _sse_event(payload: dict) -> str:
+    """Format a payload as a server-sent event."""
+    return f"data: {json.dumps(payload)}\n\n"
+
+def _sse_from_text(text: str) -> StreamingResponse:
+    """Send an already-complete answer as a single SSE event."""
+    async def gen():
+        yield _sse_event({"delta": text})
+        yield _sse_event({"done": True})
+    return StreamingResponse(gen(), media_type="text/event-stream")
+
+# Chat endpoint. The answer is a trusted string we built ourselves, so skip
+# FastAPI's response_model validation/re-serialization pass and keep
+# ResponseModel schema-only for the OpenAPI docs.
+@app.post("/api/chat", responses={200: {"model": ResponseModel}})
+@limiter.limit(CHAT_RATE_LIMIT)
 async def chat_endpoint(query: Query, request: Request):
-    """Handles customer questions to Dave."""
+    """Handles customer questions to Dave.
+
+    Clients that send Accept: text/event-stream get the answer streamed
+    token-by-token as SSE; everyone else gets the buffered JSON response.
+    """
     client_ip = get_client_ip(request)
-    
+    wants_stream = "text/event-stream" in request.headers.get("accept", "")
+
     try:
-        # Add progressive delay for frequent requests (Dave gets busier)
-        delay_seconds = get_response_delay(client_ip)
-        if delay_seconds > 0:
-            await asyncio.sleep(delay_seconds)
-        
+        # Obvious off-topic questions get the canned redirect for free
+        if _OFFTOPIC_PATTERN.search(query.question) and not _SHOP_PATTERN.search(query.question):
+            log_conversation(query.customer_type, query.question,
+                             f"[OFF-TOPIC] {OFFTOPIC_RESPONSE}", client_ip)
+            if wants_stream:
+                return _sse_from_text(OFFTOPIC_RESPONSE)
+            return ORJSONResponse({"answer": OFFTOPIC_RESPONSE})
+
+        # Exact-match cache: verbatim repeats return in microseconds
+        cache_key = (query.customer_type, query.question.strip().lower())
+        cached_answer = _RESP_CACHE.get(cache_key)
+        if cached_answer is None:
+            # Semantic cache: reuse a prior answer instead of paying for an LLM call
+            cached_answer = await semantic_cache_lookup(query.customer_type, query.question)
+        if cached_answer is not None:
+            log_conversation(query.customer_type, query.question, cached_answer, client_ip)
+            if wants_stream:
+                return _sse_from_text(cached_answer)
+            return ORJSONResponse({"answer": cached_answer})
+
         # Build Dave's prompt (no vector database needed)
-        prompt = get_dave_prompt(query.question, query.customer_type)
+        system_blocks, user_text = get_dave_prompt(query.question, query.customer_type)
+
+        if wants_stream:
+            async def stream_dave():
+                chunks = []
+                try:
+                    async with anthropic_client.messages.stream(
+                        model="claude-sonnet-4-20250514",
+                        max_tokens=300,  # Keep responses concise and practical
+                        temperature=0.7,  # Warm and friendly but consistent
+                        system=system_blocks,
+                        messages=[{"role": "user", "content": user_text}]
+                    ) as stream:
+                        async for text in stream.text_stream:
+                            chunks.append(text)
+                            yield _sse_event({"delta": text})
+                except Exception as e:
+                    # A mid-stream failure leaves truncated text in chunks;
+                    # never cache or log that as a real answer, or the
+                    # partial response would be served to every future
+                    # customer asking a similar question.
+                    logger.exception("Error streaming chat response")
+                    log_conversation(query.customer_type, query.question, f"ERROR: {str(e)}", client_ip)
+                    yield _sse_event({"error": "Sorry, having a bit of trouble right now. The till's playing up! Try again in a moment."})
+                    return
+
+                answer = "".join(chunks).strip()
+                if answer:
+                    _RESP_CACHE[cache_key] = answer
+                    await semantic_cache_store(query.customer_type, query.question, answer)
+                    log_conversation(query.customer_type, query.question, answer, client_ip)
+                yield _sse_event({"done": True})
+
+            return StreamingResponse(stream_dave(), media_type="text/event-stream")
 
         # Call Anthropic API with Dave's personality
-        anth_resp = anthropic_client.messages.create(
+        anth_resp = await anthropic_client.messages.create(
             model="claude-sonnet-4-20250514",
             max_tokens=300,  # Keep responses concise and practical
             temperature=0.7,  # Warm and friendly but consistent
-            messages=[{"role": "user", "content": prompt}]
+            system=system_blocks,
+            messages=[{"role": "user", "content": user_text}]
         )
 
-        # Extract answer
-        answer_text = ""
-        if anth_resp.content and isinstance(anth_resp.content, list) and len(anth_resp.content) > 0:
-            if hasattr(anth_resp.content[0], 'text'):
-                answer_text = anth_resp.content[0].text
+        # Extract answer - EAFP, the happy path is a single attribute access
+        try:
+            answer_text = anth_resp.content[0].text or ""
+        except (AttributeError, IndexError, TypeError):
+            answer_text = ""
 
         if not answer_text:
-            print(f"Warning: Could not extract text from Anthropic response")
+            logger.warning("Could not extract text from Anthropic response")
             answer_text = "Sorry, I'm having a bit of trouble right now. Try again in a moment!"
+        else:
+            # Only cache real answers, never the fallback apology
+            _RESP_CACHE[cache_key] = answer_text.strip()
+            await semantic_cache_store(query.customer_type, query.question, answer_text.strip())
 
         # Log the conversation for daily review
         log_conversation(query.customer_type, query.question, answer_text, client_ip)
 
-        return ResponseModel(answer=answer_text.strip())
+        return ORJSONResponse({"answer": answer_text.strip()})
 
     except Exception as e:
-        print(f"Error processing request: {e}")
-        traceback.print_exc()
-        
+        logger.exception("Error processing chat request")
+
         error_response = "Sorry, having a bit of trouble right now. The till's playing up! Try again in a moment."
         
         # Log the error conversation too
@@ -219,37 +587,59 @@ async def chat_endpoint(query: Query, request: Request):
         
         raise HTTPException(status_code=500, detail=error_response)
 
+# Constant responses serialized once at import - health probes hit these
+# endpoints constantly and the payload never changes
+_HEALTH_BYTES = orjson.dumps({"status": "healthy", "message": "Dave's shop is open!"})
+_SHOP_INFO_BYTES = orjson.dumps({
+    "name": "Dave's Village Shop",
+    "type": "Honesty Box",
+    "location": "Village High Street",
+    "owner": "Dave",
+    "payment_methods": ["Cash (honesty box)", "Exact change preferred"],
+    "specialty": "Fresh local produce, eggs, milk, and essentials"
+})
+
 # Health check endpoint
 @app.get("/api/health")
 async def health_check():
     """Simple health check endpoint."""
-    return {"status": "healthy", "message": "Dave's shop is open!"}
+    return Response(content=_HEALTH_BYTES, media_type="application/json")
 
 # Shop info endpoint
 @app.get("/api/shop-info")
 async def shop_info():
     """Basic shop information."""
-    return {
-        "name": "Dave's Village Shop",
-        "type": "Honesty Box",
-        "location": "Village High Street",
-        "owner": "Dave",
-        "payment_methods": ["Cash (honesty box)", "Exact change preferred"],
-        "specialty": "Fresh local produce, eggs, milk, and essentials"
-    }
+    return Response(content=_SHOP_INFO_BYTES, media_type="application/json")
 
 # Download daily conversations (for shop owner)
 @app.get("/api/conversations")
 async def get_conversations():
     """Download daily conversations for review."""
     try:
-        if not os.path.exists(CONVERSATIONS_FILE):
+        # Make sure buffered entries are on disk before reading
+        await flush_conversation_log()
+
+        log_files = _conversation_log_files()
+        if not log_files:
             return {"conversations": "No conversations logged yet today."}
-        
-        with open(CONVERSATIONS_FILE, "r", encoding="utf-8") as f:
-            content = f.read()
-        
-        return {"conversations": content, "filename": CONVERSATIONS_FILE}
+
+        async def iter_log():
+            # Include rotated backups (oldest first) so entries pushed out
+            # by rotation still show up in the owner's download
+            for name in log_files:
+                async with aiofiles.open(name, "r", encoding="utf-8") as f:
+                    while True:
+                        chunk = await f.read(DOWNLOAD_CHUNK_BYTES)
+                        if not chunk:
+                            break
+                        yield chunk
+
+        # Stream in chunks so a large log never gets read into memory whole
+        return StreamingResponse(
+            iter_log(),
+            media_type="text/plain",
+            headers={"Content-Disposition": f'attachment; filename="{CONVERSATIONS_FILE}"'},
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to read conversations: {str(e)}")
 
@@ -258,20 +648,48 @@ async def get_conversations():
 async def clear_conversations():
     """Clear the daily conversations file (start fresh for new day)."""
     try:
-        if os.path.exists(CONVERSATIONS_FILE):
-            # Archive the file with today's date
+        # Hold the flush lock across flush + close + move so the periodic
+        # flusher can't reopen the file mid-archive and write entries that
+        # the cross-filesystem copy+unlink path would then delete.
+        async with _log_flush_lock:
+            # Flush buffered entries so they land in the archive, not the new day
+            await _flush_log_buffer_locked()
+
+            log_files = _conversation_log_files()
+            if not log_files:
+                return {"message": "No conversations to clear"}
+
+            # Archive rotated backups along with the live file so entries
+            # pushed out by rotation aren't dropped. Close the rotating
+            # handler first so it reopens a fresh file on the next flush,
+            # and use shutil.move since os.rename fails across filesystems.
             today = datetime.now().strftime("%Y-%m-%d")
-            archive_name = f"conversations_{today}.txt"
-            os.rename(CONVERSATIONS_FILE, archive_name)
-            return {"message": f"Conversations archived as {archive_name}"}
-        else:
-            return {"message": "No conversations to clear"}
+            _log_handler.close()
+            archived = []
+            for name in log_files:
+                suffix = name[len(CONVERSATIONS_FILE):]  # "", ".1", ".2", ...
+                archive_name = f"conversations_{today}.txt{suffix}"
+                await asyncio.to_thread(shutil.move, name, archive_name)
+                archived.append(archive_name)
+
+        return {"message": f"Conversations archived as {', '.join(archived)}"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to clear conversations: {str(e)}")
 
-# Run the application
+# Run the application. Note the in-process caches and memory:// rate-limit
+# storage are per-worker; point RATE_LIMIT_STORAGE_URI at Redis when
+# running more than one worker.
 if __name__ == "__main__":
     import uvicorn
     host = os.getenv("HOST", "0.0.0.0")
     port = int(os.getenv("PORT", "8000"))
-    uvicorn.run(app, host=host, port=port, log_level="info")
\ No newline at end of file
+    workers = int(os.getenv("WORKERS", os.cpu_count() or 2))
+    uvicorn.run(
+        "main:app",
+        host=host,
+        port=port,
+        log_level="info",
+        loop="uvloop",
+        http="httptools",
+        workers=workers,
+    )
\ No newline at end of file
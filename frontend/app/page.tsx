@@ -63,6 +63,7 @@ export default function Home() {
   const [messages, setMessages] = useState<Message[]>([]);
   const [input, setInput] = useState('');
   const [loading, setLoading] = useState(false);
+  const [streaming, setStreaming] = useState(false);
   const [customerType, setCustomerType] = useState<'general' | 'first_time' | 'returning'>('general');
   const messagesEndRef = useRef<HTMLDivElement>(null);
 
@@ -76,7 +77,7 @@ export default function Home() {
 
   const handleSubmit = async (e: React.FormEvent) => {
     e.preventDefault();
-    if (!input.trim() || loading) return;
+    if (!input.trim() || loading || streaming) return;
 
     const userMessage = input;
     setMessages(prev => [...prev, { 
@@ -90,24 +91,74 @@ export default function Home() {
     try {
       const response = await fetch(process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000/api/chat', {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ 
+        headers: {
+          'Content-Type': 'application/json',
+          'Accept': 'text/event-stream'
+        },
+        body: JSON.stringify({
           question: userMessage,
           customer_type: customerType
         })
       });
 
-      const data = await response.json();
-
       if (!response.ok) {
-        throw new Error(data.detail || 'Failed to get response from Dave');
+        const data = await response.json().catch(() => null);
+        throw new Error(data?.detail || 'Failed to get response from Dave');
       }
 
-      setMessages(prev => [...prev, {
-        role: 'assistant',
-        content: data.answer,
-        timestamp: new Date().toISOString()
-      }]);
+      const contentType = response.headers.get('content-type') || '';
+
+      if (contentType.includes('text/event-stream') && response.body) {
+        // Stream Dave's answer token-by-token as it's generated
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        const timestamp = new Date().toISOString();
+        let buffer = '';
+        let answer = '';
+
+        // Swap the "thinking" spinner for a streaming bubble, but keep the
+        // input disabled (via streaming) until the stream finishes. Deltas
+        // update this fixed index, never whatever happens to be last.
+        const placeholderIndex = messages.length + 1;
+        setLoading(false);
+        setStreaming(true);
+        setMessages(prev => [...prev, { role: 'assistant', content: '', timestamp }]);
+
+        while (true) {
+          const { done, value } = await reader.read();
+          if (done) break;
+
+          buffer += decoder.decode(value, { stream: true });
+          const events = buffer.split('\n\n');
+          buffer = events.pop() || '';
+
+          for (const event of events) {
+            if (!event.startsWith('data: ')) continue;
+            const payload = JSON.parse(event.slice(6));
+            if (payload.delta) {
+              answer += payload.delta;
+            } else if (payload.error) {
+              // The stream died mid-answer; show the apology after any partial text
+              answer = answer ? `${answer}\n\n${payload.error}` : payload.error;
+            } else {
+              continue;
+            }
+            setMessages(prev => {
+              const next = [...prev];
+              next[placeholderIndex] = { ...next[placeholderIndex], content: answer };
+              return next;
+            });
+          }
+        }
+      } else {
+        const data = await response.json();
+
+        setMessages(prev => [...prev, {
+          role: 'assistant',
+          content: data.answer,
+          timestamp: new Date().toISOString()
+        }]);
+      }
 
     } catch (error) {
       console.error('Error:', error);
@@ -119,6 +170,7 @@ export default function Home() {
       }]);
     } finally {
       setLoading(false);
+      setStreaming(false);
     }
   };
 
@@ -200,12 +252,12 @@ export default function Home() {
               className="flex-1 p-4 border border-gray-300 rounded-xl text-gray-800 
                          focus:outline-none focus:ring-2 focus:ring-green-500 focus:border-transparent
                          placeholder-gray-500"
-              disabled={loading}
+              disabled={loading || streaming}
               maxLength={500}
             />
             <button
               type="submit"
-              disabled={loading || !input.trim()}
+              disabled={loading || streaming || !input.trim()}
               className="px-6 py-4 bg-green-600 text-white rounded-xl hover:bg-green-700 
                          disabled:bg-gray-300 disabled:cursor-not-allowed
                          transition-all duration-200 focus:outline-none focus:ring-2 focus:ring-green-500"